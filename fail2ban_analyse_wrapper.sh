@@ -108,6 +108,25 @@ cp -v *_fail2ban_country_hist_all.png "${OUTPUT_DIR_WEB_ABS}/unauth-country.png"
 
 if [[ -d "${OUTPUT_DIR_HISTORICAL_ABS}" ]]; then
   cp *.{csv,txt,png} "${OUTPUT_DIR_HISTORICAL_ABS}"
+  # Add this run to the rollup index of all historical runs (fail2ban_rollup.py) - optional, analysis outputs are complete without it
+  ROLLUP_ABS_PATH=$(readlink -f "${SCRIPT_DIR}/fail2ban_rollup.py")
+  if [[ -f "${ROLLUP_ABS_PATH}" ]]; then
+    echo "-------------------------------------------------------------------------------------------"
+    if [[ ! -f "${OUTPUT_DIR_HISTORICAL_ABS}/fail2ban_rollup_state.txt" ]]; then
+      # No index yet - build it from all archived runs (including this one), otherwise older runs could never be added later
+      echo "No rollup index found in ${OUTPUT_DIR_HISTORICAL} - building index from all archived runs"
+      "${ROLLUP_ABS_PATH}" "${OUTPUT_DIR_HISTORICAL_ABS}" "${OUTPUT_DIR_HISTORICAL_ABS}"/*_fail2ban_attack_IPs_all.csv
+    else
+      "${ROLLUP_ABS_PATH}" "${OUTPUT_DIR_HISTORICAL_ABS}" *_fail2ban_attack_IPs_all.csv
+    fi
+    if [[ $? -ne 0 ]]; then
+      echo "WARNING: Fail2ban historical rollup failed - historical index not updated"
+    elif [[ -s "${OUTPUT_DIR_HISTORICAL_ABS}/fail2ban_rollup_attacks_per_month_bar.png" ]]; then
+      cp -v "${OUTPUT_DIR_HISTORICAL_ABS}/fail2ban_rollup_attacks_per_month_bar.png" "${OUTPUT_DIR_WEB_ABS}/unauth-monthly.png"
+    fi
+  else
+    echo "WARNING: Cannot locate ${SCRIPT_DIR}/fail2ban_rollup.py - historical index not updated"
+  fi
 else
   echo "WARNING: Specified output directory for archiving full output ${OUTPUT_DIR_HISTORICAL} does not exist, only updating main web content"
   echo "Create ${OUTPUT_DIR_HISTORICAL} or change config to store all historical data (PNG,CSV,TXT with no overwriting)"
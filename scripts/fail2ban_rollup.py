@@ -0,0 +1,290 @@
+#!/usr/bin/env python3
+
+# Maintain a compact historical rollup index of fail2ban attacks across all runs of fail2ban_analyse.py
+
+# Syntax: fail2ban_rollup.py <index directory> <attack IPs CSV file> [<attack IPs CSV file> ...]
+#         fail2ban_rollup.py <index directory> query <IP address>
+
+# <index directory> - Directory in which the rollup index is stored (normally OUTPUT_DIR_HISTORICAL) - the index is created if it does not yet exist
+# <attack IPs CSV file> - one or more *_fail2ban_attack_IPs_all.csv files output by fail2ban_analyse.py, in form "Timestamp,IP address[,Country,Latitude,Longitude]"
+# Files are ingested in filename (datestamp) order. Consecutive runs analyse overlapping log windows, so the last few attacks ingested are stored
+# and each run is only ingested from the point after those attacks - this means archived runs must be ingested oldest first, and any run older than the index is ignored
+# In query mode, the per-IP history (number of attacks, first and last seen, country) is printed from the index without reading the archive
+# Note a query reads through fail2ban_rollup_IPs.csv, so takes time in proportion to the number of unique IPs ever seen (but not the size of the archive)
+
+# Index files written to <index directory>:
+# fail2ban_rollup_attacks_per_day.csv - total number of attacks on each day
+# fail2ban_rollup_IPs.csv - every IP seen, with cumulative number of attacks, first and last attack timestamps and country (if known)
+# fail2ban_rollup_state.txt - latest attack timestamp, total number of attacks and the last attacks ingested, used to de-duplicate overlapping runs
+# fail2ban_rollup_attacks_per_month_bar.png - bar chart of number of attacks per month over the full history of the index
+
+# Example calls:
+# fail2ban_rollup.py /var/log/fail2ban-analyse /tmp/fail2ban-analyse/20200118_fail2ban_attack_IPs_all.csv
+# fail2ban_rollup.py /var/log/fail2ban-analyse /var/log/fail2ban-analyse/*_fail2ban_attack_IPs_all.csv
+# fail2ban_rollup.py /var/log/fail2ban-analyse query 192.0.2.1
+
+# Changelog
+# 19/10/2026 - First Version
+
+# Copyright (C) 2020 Aaron Lockton
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import csv
+import sys
+import os
+from time import gmtime, strftime
+
+anchor_length = 10    # Number of last attacks ingested stored in state file, used to find where the next run continues
+
+# Process arguments and set defaults
+if len(sys.argv) < 3:
+  print("ERROR: You must specify an index directory and either one or more CSV files to ingest or 'query <IP address>'")
+  sys.exit(1)
+
+index_dir = sys.argv[1]
+if os.path.isdir(index_dir) != 1:
+  print("ERROR: Specified index directory '%s' does not exist" % index_dir)
+  sys.exit(1)
+
+daily_filename = os.path.join(index_dir, "fail2ban_rollup_attacks_per_day.csv")
+IPs_filename = os.path.join(index_dir, "fail2ban_rollup_IPs.csv")
+state_filename = os.path.join(index_dir, "fail2ban_rollup_state.txt")
+monthly_plot_filename = os.path.join(index_dir, "fail2ban_rollup_attacks_per_month_bar.png")
+
+# Query mode - look up a single IP in the index and exit
+if sys.argv[2] == "query":
+  if len(sys.argv) < 4:
+    print("ERROR: You must specify an IP address to query")
+    sys.exit(1)
+  query_IP = sys.argv[3]
+  if not os.path.isfile(IPs_filename):
+    print("ERROR: No rollup index found in %s - ingest some results first" % index_dir)
+    sys.exit(1)
+  with open(IPs_filename, "r") as f:
+    csv_reader = csv.reader(f, delimiter=",")
+    next(csv_reader, None)
+    for row in csv_reader:
+      if row[0] == query_IP:
+        print("IP %s: %s attacks, first seen %s, last seen %s, country %s" % \
+          (row[0], row[1], row[2], row[3], row[4] if row[4] != "" else "unknown"))
+        sys.exit(0)
+  print("IP %s not found in rollup index" % query_IP)
+  sys.exit(0)
+
+print(strftime("%Y-%m-%d_%H:%M:%S: Starting fail2ban rollup of historical results", gmtime()))
+
+# Sort on filename only, so runs are in datestamp order whichever directories they are in
+csv_inputs = sys.argv[2:]
+csv_inputs.sort(key=os.path.basename)
+
+# Read in existing index, if any
+attacks_day = {}
+if os.path.isfile(daily_filename):
+  with open(daily_filename, "r") as f:
+    csv_reader = csv.reader(f, delimiter=",")
+    next(csv_reader, None)
+    for row in csv_reader:
+      attacks_day[row[0]] = int(row[1])
+
+# Per-IP values are [number of attacks, first seen, last seen, country]
+IP_history = {}
+if os.path.isfile(IPs_filename):
+  with open(IPs_filename, "r") as f:
+    csv_reader = csv.reader(f, delimiter=",")
+    next(csv_reader, None)
+    for row in csv_reader:
+      IP_history[row[0]] = [int(row[1]), row[2], row[3], row[4]]
+
+# Anchor is the last attacks ingested, as [timestamp, IP address], in log order
+last_timestamp = ""
+anchor = []
+if os.path.isfile(state_filename):
+  state_total = -1
+  with open(state_filename, "r") as f:
+    in_anchor = False
+    for line in f:
+      line = line.rstrip("\n")
+      if in_anchor:
+        if line != "":
+          anchor.append(line.split(",", 1))
+      elif line.startswith("Last timestamp: "):
+        last_timestamp = line[len("Last timestamp: "):]
+      elif line.startswith("Total attacks: "):
+        state_total = int(line[len("Total attacks: "):])
+      elif line == "Last attacks ingested:":
+        in_anchor = True
+  # The index files are replaced one at a time, so check an earlier run was not interrupted part way through
+  daily_total = sum(attacks_day.values())
+  IPs_total = sum(IP_history[attack_IP][0] for attack_IP in IP_history)
+  if daily_total != state_total or IPs_total != state_total:
+    print("ERROR: Rollup index in %s is inconsistent (%d attacks in state file, %d in per-day file, %d in per-IP file) - was an earlier run interrupted?" % \
+      (index_dir, state_total, daily_total, IPs_total))
+    print("Delete %s/fail2ban_rollup_* and re-ingest all runs oldest first to rebuild the index" % index_dir)
+    sys.exit(1)
+  print("Existing index covers %d attacks up to %s" % (state_total, last_timestamp))
+elif len(attacks_day) > 0 or len(IP_history) > 0:
+  print("ERROR: Rollup index in %s has no state file - was an earlier run interrupted?" % index_dir)
+  print("Delete %s/fail2ban_rollup_* and re-ingest all runs oldest first to rebuild the index" % index_dir)
+  sys.exit(1)
+else:
+  print("No existing index found in %s - creating new index" % index_dir)
+
+# Ingest each run, skipping attacks already covered by the index. Timestamps cannot be used for this, because fail2ban logs in local time so
+# they go backwards when daylight saving ends - instead find the anchor (last attacks ingested) in the run and ingest every attack after it.
+# If the run's log window starts part way through the anchor (older logs rotated away), match the remainder of the anchor at the start of the run.
+# If the anchor cannot be found at all, fall back to ingesting only attacks later than the latest timestamp in the index - a run entirely older
+# than that is skipped, and attacks at or before that time (e.g. in a repeated daylight saving hour) may be missed
+total_added = 0
+for csv_input in csv_inputs:
+  if os.path.isfile(csv_input) != 1:
+    print("WARNING: Cannot find file %s - ignoring" % csv_input)
+    continue
+  print("Ingesting attacks from %s..." % csv_input)
+  # Attacks in the run are [timestamp, IP address, country]
+  attacks = []
+  try:
+    with open(csv_input, "r") as f:
+      csv_reader = csv.reader(f, delimiter=",")
+      csv_headers = next(csv_reader, [])
+      if csv_headers[0:2] != ["Timestamp", "IP address"]:
+        print("WARNING: Specified input file %s does not appear to be valid - must be CSV in form 'Timestamp,IP address,...' - ignoring" % csv_input)
+        continue
+      for row in csv_reader:
+        if len(row) < 2 or len(row[0]) != 19:
+          print("WARNING: Ignoring invalid line: " + ",".join(row))
+          continue
+        attacks.append([row[0], row[1], row[2] if len(row) > 2 else ""])
+  except IOError:
+    print("WARNING: Cannot read from file (check permissions?): " + csv_input + " - ignoring")
+    continue
+  if len(attacks) == 0:
+    print("Added 0 new attacks, no attacks found in %s" % csv_input)
+    continue
+  keys = [attack[0:2] for attack in attacks]
+  run_last_timestamp = max(attack[0] for attack in attacks)
+
+  # Find first attack in this run not yet in the index
+  start = -1
+  if len(anchor) == 0:
+    start = 0
+  else:
+    for ii in range(0, len(keys)-len(anchor)+1):
+      if keys[ii:ii+len(anchor)] == anchor:
+        start = ii + len(anchor)
+        break
+    if start < 0:
+      for ii in range(1, len(anchor)):
+        if keys[0:len(anchor)-ii] == anchor[ii:]:
+          start = len(anchor) - ii
+          break
+  if start >= 0:
+    new_flags = [ii >= start for ii in range(0, len(attacks))]
+  elif run_last_timestamp < last_timestamp:
+    print("WARNING: All attacks in %s are older than the last attack already in the index (%s) - this run was skipped completely" % (csv_input, last_timestamp))
+    print("To add older runs, delete %s/fail2ban_rollup_* and re-ingest all runs oldest first" % index_dir)
+    continue
+  else:
+    new_flags = [attack[0] > last_timestamp for attack in attacks]
+    if 0 < new_flags.count(True) < len(attacks):
+      print("WARNING: Cannot find last attacks in index in %s - only adding attacks after %s, some attacks at or before this time may be missed" % (csv_input, last_timestamp))
+
+  num_added = 0
+  num_skipped = 0
+  for attack, new in zip(attacks, new_flags):
+    timestamp, attack_IP, country = attack
+    if not new:
+      # Attack already counted, but fill in country if an earlier run had no geolocation
+      if attack_IP in IP_history and IP_history[attack_IP][3] == "":
+        IP_history[attack_IP][3] = country
+      num_skipped += 1
+      continue
+    day = timestamp[0:10]
+    attacks_day[day] = attacks_day.get(day, 0) + 1
+    if attack_IP in IP_history:
+      IP_history[attack_IP][0] += 1
+      IP_history[attack_IP][1] = min(IP_history[attack_IP][1], timestamp)
+      IP_history[attack_IP][2] = max(IP_history[attack_IP][2], timestamp)
+      if country != "":
+        IP_history[attack_IP][3] = country
+    else:
+      IP_history[attack_IP] = [1, timestamp, timestamp, country]
+    num_added += 1
+  print("Added %d new attacks, skipped %d already in index" % (num_added, num_skipped))
+  # The last attacks in this run become the anchor for the next run, unless nothing in it could be placed
+  if start >= 0 or num_added > 0:
+    anchor = keys[-anchor_length:]
+    last_timestamp = max(last_timestamp, run_last_timestamp)
+  total_added += num_added
+
+if len(attacks_day) == 0:
+  print("WARNING: No attacks found to add to index - exiting...")
+  sys.exit(0)
+
+# Write updated index - each file is written in full to a temporary file and then moved, so no file is left partially written
+# The files are moved one at a time, with the state file last - the total in the state file lets the next run detect if this was interrupted
+print("Writing %d days and %d unique IPs to rollup index in %s" % (len(attacks_day), len(IP_history), index_dir))
+try:
+  with open(daily_filename + ".tmp", "w") as f:
+    f.write("Date,Number of Attacks\n")
+    for day in sorted(attacks_day):
+      f.write("%s,%s\n" % (day, attacks_day[day]))
+  with open(IPs_filename + ".tmp", "w") as f:
+    f.write("IP address,Number of Attacks,First Seen,Last Seen,Country\n")
+    for attack_IP in sorted(IP_history):
+      f.write("%s,%s,%s,%s,%s\n" % tuple([attack_IP] + IP_history[attack_IP]))
+  with open(state_filename + ".tmp", "w") as f:
+    f.write("Last timestamp: %s\n" % last_timestamp)
+    f.write("Total attacks: %d\n" % sum(attacks_day.values()))
+    f.write("Last attacks ingested:\n")
+    for key in anchor:
+      f.write("%s,%s\n" % (key[0], key[1]))
+except IOError:
+  print("ERROR: Cannot write to index directory (check permissions?): " + index_dir)
+  sys.exit(1)
+os.replace(daily_filename + ".tmp", daily_filename)
+os.replace(IPs_filename + ".tmp", IPs_filename)
+os.replace(state_filename + ".tmp", state_filename)
+print("Index now covers %d total attacks (%d new) up to %s" % (sum(attacks_day.values()), total_added, last_timestamp))
+
+# Calculate and plot bar chart of number of attacks per month over full history (fail2ban_rollup_attacks_per_month_bar.png)
+# The index is already updated at this point, so a failure here only warns and does not fail the rollup
+print("Importing modules and plotting number of attacks per month on chart")
+try:
+  import datetime as DT
+  import matplotlib
+  matplotlib.use('Agg')
+  import matplotlib.pyplot as plt
+  attacks_month = {}
+  for day in attacks_day:
+    attacks_month[day[0:7]] = attacks_month.get(day[0:7], 0) + attacks_day[day]
+  months = sorted(attacks_month)
+  month_dates = [DT.datetime.strptime(month, "%Y-%m") for month in months]
+  num_attacks_month = [attacks_month[month] for month in months]
+  fig, ax = plt.subplots(1)
+  plt.bar(month_dates, num_attacks_month, width=25, align='edge')
+  ax.xaxis_date()
+  plt.ylabel('Number of attacks')
+  plt.rcParams["axes.titlesize"] = 10
+  plt.title("Attacks per month\nTotal %d attacks from %d unique IPs, %s to %s" % \
+    (sum(num_attacks_month), len(IP_history), min(attacks_day), max(attacks_day)))
+  fig.set_size_inches(8,6)
+  fig.autofmt_xdate(bottom=0.15)
+  dateFmt = matplotlib.dates.DateFormatter('%Y-%m')
+  ax.xaxis.set_major_formatter(dateFmt)
+  plt.savefig(monthly_plot_filename, format='png', dpi=300)
+except Exception as e:
+  print("WARNING: Could not plot monthly attacks chart %s (%s) - rollup index was still updated" % (monthly_plot_filename, e))
+
+print(strftime("%Y-%m-%d_%H:%M:%S: Completed fail2ban rollup of historical results", gmtime()))